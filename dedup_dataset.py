@@ -0,0 +1,282 @@
+"""
+Perceptual-hash near-duplicate index for the NTHU-DDD dataset
+The images are consecutive video frames, so many of them are near-duplicates.
+This script hashes every image in train/valid/test in parallel (cached in an
+index file so re-runs only hash new or changed images), clusters near-duplicates,
+reports train/valid/test leakage and writes data_dedup.yaml for train.py.
+
+Roboflow split the frames at random, so most valid/test frames have a
+neighbour in train. When most of an evaluation split leaks, the images are
+re-split by scene instead: videos that share near-duplicate frames (same
+subject, glasses and setting) are merged, and whole scenes go to one split,
+so validation numbers come from scenes the model never trained on.
+
+Run: python dedup_dataset.py [--threshold 4] [--dedup-threshold 0] [--resplit auto]
+"""
+
+import os
+import re
+import json
+import argparse
+import cv2
+import yaml
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+DATASET_DIR = 'nthuddd-1'
+SPLITS = ['train', 'valid', 'test']  # Order matters: leakage is checked against earlier splits
+INDEX_PATH = os.path.join(DATASET_DIR, 'phash_index.json')
+DEDUP_YAML = os.path.join(DATASET_DIR, 'data_dedup.yaml')
+HASH_VERSION = 2  # Bump when phash() changes so cached hashes are recomputed
+
+HAMMING_THRESH = 4     # Max differing bits (out of 63) for leakage between splits
+DEDUP_THRESH = 0       # Max differing bits for thinning train (0 = identical hashes)
+MIN_IMAGES = 100       # Refuse to write the yaml if a split keeps fewer images
+RESPLIT_LEAK = 0.5     # Re-split by video when more than this share of valid/test leaks
+UNNAMED_CHUNK = 250    # Frame-number range grouped as one video for unnamed images
+
+# Number of set bits for every byte value, used to popcount XORed hashes
+BIT_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def phash(path):
+    """63-bit DCT perceptual hash of an image, as a hex string (8 bytes)"""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    # Drop the DC term, it only encodes brightness; 63 bits remain
+    low = cv2.dct(small)[:8, :8].flatten()[1:]
+    bits = low > np.median(low)
+    return np.packbits(bits).tobytes().hex()
+
+
+def list_images():
+    """Return [(split, relative image path)] for all splits"""
+    images = []
+    for split in SPLITS:
+        image_dir = os.path.join(DATASET_DIR, split, 'images')
+        for name in sorted(os.listdir(image_dir)):
+            images.append((split, os.path.join(split, 'images', name)))
+    return images
+
+
+def image_class(rel_path):
+    """Class id of the first box in the YOLO label file, or None"""
+    label_path = os.path.join(DATASET_DIR, rel_path.replace('images', 'labels', 1))
+    label_path = os.path.splitext(label_path)[0] + '.txt'
+    if not os.path.exists(label_path):
+        return None
+    with open(label_path) as f:
+        line = f.readline().split()
+    return int(line[0]) if line else None
+
+
+def load_index(images):
+    """Hash all images, reusing entries whose size, mtime and hash version are unchanged"""
+    index = {}
+    if os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+
+    stale = []
+    for _, rel_path in images:
+        stat = os.stat(os.path.join(DATASET_DIR, rel_path))
+        entry = index.get(rel_path)
+        if (entry is None or entry.get('version') != HASH_VERSION
+                or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime):
+            index[rel_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'version': HASH_VERSION}
+            stale.append(rel_path)
+
+    if stale:
+        print(f"Hashing {len(stale)} images ({len(images) - len(stale)} cached)...")
+        paths = [os.path.join(DATASET_DIR, p) for p in stale]
+        with ProcessPoolExecutor() as pool:
+            for rel_path, digest in zip(stale, pool.map(phash, paths, chunksize=32)):
+                index[rel_path]['hash'] = digest
+
+    # Drop entries for images that no longer exist
+    present = {rel_path for _, rel_path in images}
+    index = {k: v for k, v in index.items() if k in present}
+    with open(INDEX_PATH, 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return index
+
+
+def cluster(hashes, threshold):
+    """Greedy leader clustering: each image joins its nearest leader if that
+    is within threshold bits, otherwise it becomes a new leader. Unlike
+    single-linkage this does not chain a whole slowly-changing video into one
+    cluster."""
+    leaders = np.zeros((len(hashes), 8), dtype=np.uint8)
+    num_leaders = 0
+    labels = np.empty(len(hashes), dtype=np.int64)
+    for i, h in enumerate(hashes):
+        if num_leaders:
+            dist = BIT_COUNTS[leaders[:num_leaders] ^ h].sum(axis=1)
+            nearest = int(dist.argmin())
+            if dist[nearest] <= threshold:
+                labels[i] = nearest
+                continue
+        leaders[num_leaders] = h
+        labels[i] = num_leaders
+        num_leaders += 1
+    return labels
+
+
+def min_distances(hashes, others):
+    """Smallest Hamming distance from each hash to any hash in others"""
+    if len(others) == 0:
+        return np.full(len(hashes), 64, dtype=np.int64)
+    return np.array([BIT_COUNTS[others ^ h].sum(axis=1).min() for h in hashes])
+
+
+def video_key(rel_path):
+    """Video an image was taken from, e.g. '001_glasses_sleepyCombination'.
+    Images named only by frame number are grouped into UNNAMED_CHUNK ranges."""
+    name = os.path.basename(rel_path)
+    match = re.match(r'^(.*)_\d+_(?:not)?drowsy_', name)
+    if match:
+        return match.group(1)
+    match = re.match(r'^(\d+)_jpg', name)
+    if match:
+        return f'unnamed_{int(match.group(1)) // UNNAMED_CHUNK}'
+    return name
+
+
+def split_by_scene(images, hashes, threshold):
+    """Assign whole scenes to splits, keeping the original split proportions.
+
+    A scene is a set of videos linked by any pair of frames within threshold
+    bits, so no frame can have a near-duplicate in another split.
+    """
+    videos = {}
+    for i, (_, rel_path) in enumerate(images):
+        videos.setdefault(video_key(rel_path), []).append(i)
+
+    parent = {key: key for key in videos}
+
+    def find(key):
+        while parent[key] != key:
+            key = parent[key]
+        return key
+
+    keys = sorted(videos)
+    for a, key_a in enumerate(keys):
+        for key_b in keys[a + 1:]:
+            if min_distances(hashes[videos[key_a]], hashes[videos[key_b]]).min() <= threshold:
+                parent[find(key_a)] = find(key_b)
+    scenes = {}
+    for key in keys:
+        scenes.setdefault(find(key), []).extend(videos[key])
+
+    target = {split: sum(1 for s, _ in images if s == split) for split in SPLITS}
+    size = {split: 0 for split in SPLITS}
+    splits = np.empty(len(images), dtype=object)
+    # Largest scenes first, each to the split furthest below its target size
+    for members in sorted(scenes.values(), key=lambda m: (-len(m), m[0])):
+        split = min(SPLITS, key=lambda s: size[s] / target[s] if target[s] else float('inf'))
+        splits[members] = split
+        size[split] += len(members)
+    return splits.astype(str)
+
+
+def find_leaks(hashes, splits, threshold):
+    """True for every image within threshold of any image of an earlier split"""
+    leaked = np.zeros(len(hashes), dtype=bool)
+    for i, split in enumerate(SPLITS[1:], start=1):
+        members = np.flatnonzero(splits == split)
+        earlier = hashes[np.isin(splits, SPLITS[:i])]
+        leaked[members] = min_distances(hashes[members], earlier) <= threshold
+    return leaked
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threshold', type=int, default=HAMMING_THRESH,
+                        help=f'max differing bits (of 63) for leakage between splits (default {HAMMING_THRESH})')
+    parser.add_argument('--dedup-threshold', type=int, default=DEDUP_THRESH,
+                        help=f'max differing bits when thinning train (default {DEDUP_THRESH})')
+    parser.add_argument('--min-images', type=int, default=MIN_IMAGES,
+                        help=f'refuse to write the yaml if a split keeps fewer images (default {MIN_IMAGES})')
+    parser.add_argument('--resplit', choices=['auto', 'always', 'never'], default='auto',
+                        help=f"re-split by scene: 'auto' when over {int(RESPLIT_LEAK * 100)}%% of valid/test leaks")
+    parser.add_argument('--keep-leaked', action='store_true',
+                        help='keep valid/test images that duplicate an earlier split')
+    parser.add_argument('--force', action='store_true',
+                        help='write the yaml even if a split is below --min-images')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    images = list_images()
+    index = load_index(images)
+    hashes = np.array([np.frombuffer(bytes.fromhex(index[p]['hash']), dtype=np.uint8)
+                       for _, p in images])
+    splits = np.array([split for split, _ in images])
+
+    leaked = find_leaks(hashes, splits, args.threshold)
+    print("=" * 60)
+    print("NEAR-DUPLICATE REPORT")
+    print("=" * 60)
+    print(f"Leakage threshold: {args.threshold}/63 bits, train dedup threshold: {args.dedup_threshold}")
+    for split in SPLITS[1:]:
+        mask = splits == split
+        print(f"{split:>6}: {leaked[mask].sum()}/{mask.sum()} images duplicate an earlier split")
+
+    leak_share = max(leaked[splits == s].mean() for s in SPLITS[1:] if (splits == s).any())
+    if args.resplit == 'always' or (args.resplit == 'auto' and leak_share > RESPLIT_LEAK):
+        splits = split_by_scene(images, hashes, args.threshold)
+        leaked = find_leaks(hashes, splits, args.threshold)
+        print(f"Re-split by scene ({len({video_key(p) for _, p in images})} videos):")
+        for split in SPLITS:
+            mask = splits == split
+            videos = sorted({video_key(images[i][1]) for i in np.flatnonzero(mask)})
+            print(f"{split:>6}: {mask.sum()} images, {leaked[mask].sum()} still leak - {', '.join(videos)}")
+
+    kept = {split: [] for split in SPLITS}
+    dropped = {split: 0 for split in SPLITS}
+    for split in SPLITS:
+        members = np.flatnonzero(splits == split)
+        # Only train is thinned out; keep one image per cluster and class
+        # so no label is lost
+        clusters = cluster(hashes[members], args.dedup_threshold) if split == 'train' else range(len(members))
+        seen = set()
+        for i, c in zip(members, clusters):
+            rel_path = images[i][1]
+            key = (c, image_class(rel_path))
+            if (leaked[i] and not args.keep_leaked) or key in seen:
+                dropped[split] += 1
+                continue
+            seen.add(key)
+            kept[split].append('./' + rel_path.replace(os.sep, '/'))
+
+    print("-" * 60)
+    for split in SPLITS:
+        print(f"{split:>6}: {len(kept[split])} kept, {dropped[split]} dropped")
+
+    small = [split for split in SPLITS if len(kept[split]) < args.min_images]
+    if small:
+        print(f"Error: {', '.join(small)} kept fewer than {args.min_images} images, too few for "
+              "trustworthy numbers. Try --resplit always, a lower --dedup-threshold or --keep-leaked.")
+        if not args.force:
+            print(f"{DEDUP_YAML} not written (use --force to write it anyway)")
+            return
+        if any(not kept[split] for split in small):
+            print(f"Cannot write {DEDUP_YAML} with an empty split")
+            return
+
+    with open(os.path.join(DATASET_DIR, 'data.yaml')) as f:
+        data = yaml.safe_load(f)
+    dedup = {'names': data['names'], 'nc': data['nc']}
+    for split, key in zip(SPLITS, ['train', 'val', 'test']):
+        list_name = f'{split}_dedup.txt'
+        with open(os.path.join(DATASET_DIR, list_name), 'w') as f:
+            f.write('\n'.join(kept[split]) + '\n')
+        dedup[key] = list_name
+    with open(DEDUP_YAML, 'w') as f:
+        yaml.safe_dump(dedup, f, sort_keys=False)
+    print(f"Wrote {DEDUP_YAML} - set DATA_YAML in train.py to use it")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Lightweight eye-state classifier on landmark-cropped eye patches
+Sits between the EAR threshold and the full-frame YOLO model: both eyes are
+cropped from the CLAHE-enhanced grayscale frame using the FaceMesh L_EYE/R_EYE
+points and classified in a single batched call of a tiny MLP (NumPy, or ONNX
+Runtime when given a .onnx model). Train it with train_eye_classifier.py.
+"""
+
+import os
+import cv2
+import numpy as np
+from utils import calculate_ear, L_EYE, R_EYE
+
+MODEL_PATH = 'eye_state.npz'
+PATCH_SIZE = 24     # Patches are PATCH_SIZE x PATCH_SIZE grayscale
+PATCH_SCALE = 1.6   # Crop side relative to the eye corner-to-corner width
+CLOSED_THRESH = 0.5
+
+
+def extract_eye_patches(gray, landmarks):
+    """Crop both eyes from a grayscale frame.
+
+    Returns a (2, PATCH_SIZE * PATCH_SIZE) float32 batch (left eye, then the
+    right eye mirrored so both share one orientation), normalized per patch,
+    or None if an eye falls outside the frame.
+    """
+    h, w = gray.shape[:2]
+    points = np.array([(landmarks[i].x, landmarks[i].y) for i in L_EYE + R_EYE],
+                      dtype=np.float32).reshape(2, 6, 2) * (w, h)
+    centers = points.mean(axis=1)
+    sides = np.linalg.norm(points[:, 0] - points[:, 3], axis=1) * PATCH_SCALE
+
+    patches = np.empty((2, PATCH_SIZE, PATCH_SIZE), dtype=np.float32)
+    for i, ((cx, cy), side) in enumerate(zip(centers, sides)):
+        x0, y0 = max(int(cx - side / 2), 0), max(int(cy - side / 2), 0)
+        x1, y1 = min(int(cx + side / 2), w), min(int(cy + side / 2), h)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+        patch = cv2.resize(gray[y0:y1, x0:x1], (PATCH_SIZE, PATCH_SIZE),
+                           interpolation=cv2.INTER_AREA)
+        patches[i] = cv2.flip(patch, 1) if i == 1 else patch
+
+    patches = patches.reshape(2, -1)
+    patches -= patches.mean(axis=1, keepdims=True)
+    patches /= patches.std(axis=1, keepdims=True) + 1e-6
+    return patches
+
+
+class EyeStateClassifier:
+    """Predicts the probability that each eye patch shows a closed eye
+    (trained on per-eye labels, see train_eye_classifier.py)"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Eye model not found at {model_path} - run train_eye_classifier.py")
+        self.session = None
+        if model_path.endswith('.onnx'):
+            import onnxruntime
+            self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+            self.input_name = self.session.get_inputs()[0].name
+        else:
+            weights = np.load(model_path)
+            self.w1, self.b1 = weights['w1'], weights['b1']
+            self.w2, self.b2 = weights['w2'], weights['b2']
+
+    def predict(self, patches):
+        """patches: (N, PATCH_SIZE * PATCH_SIZE) float32 -> (N,) closed probability"""
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: patches})[0].ravel()
+        return forward(patches, self.w1, self.b1, self.w2, self.b2)[1].ravel()
+
+
+def forward(x, w1, b1, w2, b2):
+    """MLP forward pass, returns (hidden activations, closed probability)"""
+    hidden = np.maximum(x @ w1 + b1, 0.0)
+    return hidden, 1.0 / (1.0 + np.exp(-(hidden @ w2 + b2)))
+
+
+def eyes_closed(gray, landmarks, model, ear_thresh):
+    """Detector backend switch: returns (closed, overlay text).
+
+    Uses the classifier when model is an EyeStateClassifier, otherwise the
+    EAR threshold.
+    """
+    if model is not None:
+        patches = extract_eye_patches(gray, landmarks)
+        if patches is not None:
+            closed = float(model.predict(patches).mean())
+            return closed > CLOSED_THRESH, f"Closed: {closed:.2f}"
+    ear = (calculate_ear(landmarks, L_EYE) + calculate_ear(landmarks, R_EYE)) / 2.0
+    return ear < ear_thresh, f"EAR: {ear:.2f}"
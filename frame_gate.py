@@ -0,0 +1,87 @@
+"""
+Motion / quality gate run before FaceMesh or YOLO inference
+Works on a downscaled copy of the CLAHE-enhanced grayscale frame the detection
+loops already compute. Frames that barely changed since the last inference
+reuse its result, frames too dark or blurry to classify are skipped.
+"""
+
+import cv2
+import numpy as np
+
+GATE_SIZE = (160, 120)  # (w, h) of the frame the gate looks at
+BLOCK = 10              # Motion is measured per BLOCK x BLOCK cell
+DARK_THRESH = 40        # Mean brightness below this = too dark
+BLUR_THRESH = 25.0      # Laplacian variance below this = too blurry
+MOTION_THRESH = 4.0     # Largest cell change below this = nothing changed
+MAX_REUSE = 3           # Run inference at least every MAX_REUSE + 1 frames
+
+RUN = 'run'
+REUSE = 'reuse'
+DARK = 'dark'
+BLUR = 'blurry'
+
+
+class FrameGate:
+    def __init__(self, dark_thresh=DARK_THRESH, blur_thresh=BLUR_THRESH,
+                 motion_thresh=MOTION_THRESH, max_reuse=MAX_REUSE):
+        self.dark_thresh = dark_thresh
+        self.blur_thresh = blur_thresh
+        self.motion_thresh = motion_thresh
+        self.max_reuse = max_reuse
+        self.counts = {RUN: 0, REUSE: 0, DARK: 0, BLUR: 0}
+        self.brightness = 0.0
+        self.blur = 0.0
+        self.motion = 0.0
+        self._reference = None
+        self._reused = 0
+
+    def check(self, enhanced_gray, allow_reuse=True):
+        """Return RUN, REUSE, DARK or BLUR for this frame and count it.
+
+        A reused result is not a new observation, so callers only advance
+        their drowsiness counters on RUN. Pass allow_reuse=False while drowsy
+        evidence is pending, so those counters keep advancing every frame.
+        """
+        small = cv2.resize(enhanced_gray, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        self.brightness = float(small.mean())
+        self.blur = float(cv2.Laplacian(small, cv2.CV_64F).var())
+        self.motion = self._motion(small)
+
+        if self.brightness < self.dark_thresh:
+            decision = DARK
+        elif self.blur < self.blur_thresh:
+            decision = BLUR
+        elif allow_reuse and self.motion < self.motion_thresh and self._reused < self.max_reuse:
+            decision = REUSE
+            self._reused += 1
+        else:
+            decision = RUN
+            self._reference = small
+            self._reused = 0
+
+        self.counts[decision] += 1
+        return decision
+
+    def _motion(self, small):
+        # Compare against the frame inference last ran on, per cell rather than
+        # globally, so a closing eyelid isn't averaged away by a static background
+        if self._reference is None:
+            return float('inf')
+        diff = cv2.absdiff(small, self._reference).astype(np.float32)
+        h, w = diff.shape
+        cells = diff[:h // BLOCK * BLOCK, :w // BLOCK * BLOCK]
+        cells = cells.reshape(h // BLOCK, BLOCK, w // BLOCK, BLOCK).mean(axis=(1, 3))
+        return float(cells.max())
+
+    def summary(self):
+        return format_counts(self.counts)
+
+
+def format_counts(counts):
+    """One-line summary of a FrameGate.counts dict"""
+    total = sum(counts.values())
+    skipped = total - counts[RUN]
+    percent = 100.0 * skipped / total if total else 0.0
+    return (f"Gate: run {counts[RUN]}, reuse {counts[REUSE]}, "
+            f"dark {counts[DARK]}, blurry {counts[BLUR]} "
+            f"({percent:.0f}% of inference calls skipped)")
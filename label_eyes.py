@@ -0,0 +1,111 @@
+"""
+Hand-label eye states for train_eye_classifier.py
+Shows the left and right eye crops of each dataset image (enlarged, next to the
+whole frame) and appends one row per eye to eye_labels.csv. Images already in
+the file are skipped, so labelling can be stopped and resumed at any time.
+
+Keys, asked for the left eye and then the right eye:
+  o = open, c = closed, s = skip this eye, q = quit
+Run: python label_eyes.py [split ...]   (default: valid test)
+"""
+
+import os
+import sys
+import csv
+import cv2
+import numpy as np
+from train_eye_classifier import create_face_mesh, DATASET_DIR, EYE_LABELS_CSV, EYES
+from utils import L_EYE, R_EYE
+
+WINDOW = 'Label eyes'
+CROP_VIEW = 240  # Displayed size of each eye crop
+KEYS = {ord('o'): 0, ord('c'): 1}
+
+
+def eye_crops(frame, landmarks):
+    """Enlarged crops around both eyes (left, right), or None if off-frame"""
+    h, w = frame.shape[:2]
+    crops = []
+    for eye in [L_EYE, R_EYE]:
+        points = np.array([(landmarks[i].x * w, landmarks[i].y * h) for i in eye])
+        side = np.linalg.norm(points[0] - points[3]) * 2.0
+        cx, cy = points.mean(axis=0)
+        x0, y0 = max(int(cx - side / 2), 0), max(int(cy - side / 2), 0)
+        x1, y1 = min(int(cx + side / 2), w), min(int(cy + side / 2), h)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+        crops.append(cv2.resize(frame[y0:y1, x0:x1], (CROP_VIEW, CROP_VIEW),
+                                interpolation=cv2.INTER_CUBIC))
+    return crops
+
+
+def ask(view, prompt):
+    """Show the view with a prompt, return 0/1, None (skip) or 'quit'"""
+    shown = view.copy()
+    cv2.putText(shown, prompt, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    cv2.imshow(WINDOW, shown)
+    while True:
+        key = cv2.waitKey(0) & 0xFF
+        if key in KEYS:
+            return KEYS[key]
+        if key == ord('s'):
+            return None
+        if key == ord('q'):
+            return 'quit'
+
+
+def main():
+    splits = sys.argv[1:] or ['valid', 'test']
+    labelled = set()
+    if os.path.exists(EYE_LABELS_CSV):
+        with open(EYE_LABELS_CSV, newline='') as f:
+            labelled = {row['image'] for row in csv.DictReader(f)}
+
+    new_file = not os.path.exists(EYE_LABELS_CSV)
+    face_mesh = create_face_mesh()
+    count = 0
+    with open(EYE_LABELS_CSV, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(['image', 'eye', 'closed'])
+        for split in splits:
+            image_dir = os.path.join(DATASET_DIR, split, 'images')
+            for name in sorted(os.listdir(image_dir)):
+                if name in labelled:
+                    continue
+                frame = cv2.imread(os.path.join(image_dir, name))
+                if frame is None:
+                    print(f"Warning: cannot read {name}, skipping")
+                    continue
+                results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                if not results.multi_face_landmarks:
+                    continue
+                crops = eye_crops(frame, results.multi_face_landmarks[0].landmark)
+                if crops is None:
+                    continue
+
+                # Whole frame on the left for context, eye crops on the right
+                h = CROP_VIEW * 2
+                context = cv2.resize(frame, (int(frame.shape[1] * h / frame.shape[0]), h))
+                view = np.hstack([context, np.vstack(crops)])
+                for eye, crop_y in zip(EYES, [0, CROP_VIEW]):
+                    marked = view.copy()
+                    x = context.shape[1]
+                    cv2.rectangle(marked, (x, crop_y), (x + CROP_VIEW - 1, crop_y + CROP_VIEW - 1),
+                                  (0, 255, 0), 2)
+                    answer = ask(marked, f"{eye} eye: o=open c=closed s=skip q=quit")
+                    if answer == 'quit':
+                        cv2.destroyAllWindows()
+                        print(f"Labelled {count} eyes, saved to {EYE_LABELS_CSV}")
+                        return
+                    if answer is not None:
+                        writer.writerow([name, eye, answer])
+                        count += 1
+                f.flush()
+
+    cv2.destroyAllWindows()
+    print(f"Labelled {count} eyes, saved to {EYE_LABELS_CSV}")
+
+
+if __name__ == '__main__':
+    main()
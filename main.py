@@ -3,11 +3,15 @@ import mediapipe as mp
 import time
 import threading
 from pygame import mixer
-from utils import calculate_ear, get_head_pose
+from utils import get_head_pose
+from eye_classifier import EyeStateClassifier, eyes_closed
+from frame_gate import FrameGate, RUN, REUSE
 
 EYE_THRESH = 0.21
 PITCH_THRESH = 0.35 # Threshold for head nodding down
 CONSEC_FRAMES = 20
+EYE_BACKEND = 'ear' # 'ear' = EAR threshold, 'classifier' = eye patch model (train_eye_classifier.py)
+EYE_MODEL_PATH = 'eye_state.npz' # or 'eye_state.onnx' to run the classifier with ONNX Runtime
 
 mixer.init()
 # Ensure you have an 'alarm.wav' file in your folder
@@ -24,11 +28,11 @@ face_mesh = mp_face_mesh.FaceMesh(
     min_tracking_confidence=0.5
 )
 
-L_EYE = [362, 385, 387, 263, 373, 380]
-R_EYE = [33, 160, 158, 133, 153, 144]
-
 cap = cv2.VideoCapture(0)
 COUNTER = 0
+gate = FrameGate()
+eye_model = EyeStateClassifier(EYE_MODEL_PATH) if EYE_BACKEND == 'classifier' else None
+last_results = None
 
 while cap.isOpened():
     success, frame = cap.read()
@@ -40,23 +44,36 @@ while cap.isOpened():
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
     enhanced_gray = clahe.apply(gray)
-    frame_rgb = cv2.cvtColor(enhanced_gray, cv2.COLOR_GRAY2RGB)
 
-    results = face_mesh.process(frame_rgb)
+    # Skip FaceMesh on unchanged frames (reuse landmarks) and unusable ones
+    # Never reuse while COUNTER is building up, so eye closure isn't detected late
+    decision = gate.check(enhanced_gray, allow_reuse=COUNTER == 0)
+    if decision == RUN:
+        frame_rgb = cv2.cvtColor(enhanced_gray, cv2.COLOR_GRAY2RGB)
+        last_results = face_mesh.process(frame_rgb)
+        results = last_results
+    elif decision == REUSE:
+        results = last_results
+    else:
+        results = None
+        cv2.putText(frame, f"Frame skipped: too {decision}", (10, 460),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
 
-    if results.multi_face_landmarks:
+    if results and results.multi_face_landmarks:
         for face_lms in results.multi_face_landmarks:
             landmarks = face_lms.landmark
             
-            # 3. EAR calculation (Eyes)
-            ear = (calculate_ear(landmarks, L_EYE) + calculate_ear(landmarks, R_EYE)) / 2.0
+            # 3. Eye state (EAR threshold or eye patch classifier)
+            closed, eye_text = eyes_closed(enhanced_gray, landmarks, eye_model, EYE_THRESH)
             
             # 4. HEAD POSE (Pitch for nodding)
             # This handles drowsiness even if eyes are semi-open but head drops
             pitch = get_head_pose(landmarks, w, h)
 
-            # 5. DROWSINESS LOGIC
-            if ear < EYE_THRESH or pitch > PITCH_THRESH:
+            # 5. DROWSINESS LOGIC (reused landmarks are not a new observation)
+            if decision == REUSE:
+                pass  # COUNTER is 0 here (see gate.check above), nothing new to count
+            elif closed or pitch > PITCH_THRESH:
                 COUNTER += 1
                 if COUNTER >= CONSEC_FRAMES:
                     cv2.putText(frame, "!!! DROWSINESS ALERT !!!", (100, 200),
@@ -66,11 +83,12 @@ while cap.isOpened():
             else:
                 COUNTER = 0
 
-            cv2.putText(frame, f"EAR: {ear:.2f} Pitch: {pitch:.2f}", (10, 30), 
+            cv2.putText(frame, f"{eye_text} Pitch: {pitch:.2f}", (10, 30), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
     cv2.imshow('Robust Drowsiness System', frame)
     if cv2.waitKey(1) & 0xFF == ord('q'): break
 
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+cv2.destroyAllWindows()
+print(gate.summary())
\ No newline at end of file
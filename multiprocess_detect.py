@@ -0,0 +1,381 @@
+"""
+Multi-process drowsiness detection
+Capture, FaceMesh landmarks, YOLO and telemetry/recording each run in their own
+process and share frames through a FrameRing (shared memory), so the work is
+spread over several cores instead of one Python interpreter.
+Only small result dicts travel over the queue; frames are never pickled.
+A consumer that crashes is restarted without interrupting capture.
+
+Run: python multiprocess_detect.py   (press 'q' or ESC to quit)
+"""
+
+import os
+import cv2
+import time
+import queue
+import multiprocessing
+from pygame import mixer
+from shared_frames import FrameRing
+from frame_gate import FrameGate, format_counts, RUN, REUSE
+
+# Frame ring settings
+CAMERA_ID = 0
+FRAME_SHAPE = (480, 640, 3)
+NUM_SLOTS = 8
+
+# Landmark (EAR / head pose) settings - same as main.py
+EYE_THRESH = 0.21
+PITCH_THRESH = 0.35
+CONSEC_FRAMES = 20
+EYE_BACKEND = 'ear'  # 'ear' = EAR threshold, 'classifier' = eye patch model
+EYE_MODEL_PATH = 'eye_state.npz'  # or 'eye_state.onnx' for ONNX Runtime
+
+# YOLO settings - same as detect_webcam.py
+MODEL_PATH = 'runs/detect/train/weights/best.pt'
+CONFIDENCE_THRESHOLD = 0.25
+ALERT_THRESHOLD = 3
+DROWSY_CLASS_ID = 0
+
+# Telemetry settings
+TELEMETRY_INTERVAL = 5.0  # Seconds between telemetry reports
+RECORD_PATH = None        # Set e.g. 'session.avi' to record the camera stream
+
+# Worker restart policy
+RESTART_DELAY = 1.0  # Seconds before restarting a crashed worker, doubled per failed start
+MIN_UPTIME = 5.0     # A worker that dies sooner than this after starting failed to start
+MAX_RESTARTS = 3     # Give up on a worker after this many failed starts in a row
+
+
+def capture_worker(spec, stop_event, results):
+    """Read the webcam and publish frames into the ring"""
+    ring = FrameRing.attach(spec)
+    h, w = ring.shape[:2]
+    cap = cv2.VideoCapture(CAMERA_ID)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+
+    while not stop_event.is_set():
+        success, frame = cap.read()
+        if not success:
+            time.sleep(0.1)
+            continue
+        if frame.shape[:2] != (h, w):
+            frame = cv2.resize(frame, (w, h))
+        ring.write(frame)
+
+    cap.release()
+    ring.close()
+
+
+def landmark_worker(spec, stop_event, results):
+    """FaceMesh + EAR / head pitch on the newest frame"""
+    # Heavy imports stay inside the worker so other processes don't pay for them
+    import mediapipe as mp
+    from utils import get_head_pose
+    from eye_classifier import EyeStateClassifier, eyes_closed
+
+    ring = FrameRing.attach(spec)
+    face_mesh = mp.solutions.face_mesh.FaceMesh(
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    gate = FrameGate()
+    eye_model = EyeStateClassifier(EYE_MODEL_PATH) if EYE_BACKEND == 'classifier' else None
+    h, w = ring.shape[:2]
+    seq = -1
+    last = {'face': False}
+
+    while True:
+        seq = ring.wait_newer(seq, stop_event)
+        if seq is None:
+            break
+        frame = ring.read(seq)
+        if frame is None:
+            continue
+        enhanced = clahe.apply(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        frame = None  # Drop the shared-memory view so ring.close() can release the buffer
+        if not ring.is_valid(seq):
+            continue  # Slot was overwritten while we read it
+
+        # Never reuse while drowsy evidence is pending, so alerts aren't delayed
+        pending = last['face'] and (last['closed'] or last['pitch'] > PITCH_THRESH)
+        decision = gate.check(enhanced, allow_reuse=not pending)
+        if decision == RUN:
+            face = face_mesh.process(cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB))
+            last = {'face': False}
+            if face.multi_face_landmarks:
+                landmarks = face.multi_face_landmarks[0].landmark
+                last['face'] = True
+                last['closed'], last['eye_text'] = eyes_closed(enhanced, landmarks, eye_model, EYE_THRESH)
+                last['pitch'] = float(get_head_pose(landmarks, w, h))
+        fields = last if decision in (RUN, REUSE) else {'face': False}
+        _post(results, dict(fields, source='landmark', seq=seq, gate=decision,
+                            gate_counts=gate.counts))
+
+    ring.close()
+
+
+def yolo_worker(spec, stop_event, results):
+    """YOLO face-state detection on the newest frame"""
+    from ultralytics import YOLO
+
+    ring = FrameRing.attach(spec)
+    model = YOLO(MODEL_PATH)
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    gate = FrameGate()
+    seq = -1
+    last = {'box': None}
+
+    while True:
+        seq = ring.wait_newer(seq, stop_event)
+        if seq is None:
+            break
+        frame = ring.read(seq)
+        if frame is None:
+            continue
+        # Same preprocessing as detect_webcam.py (flip for selfie view + CLAHE)
+        enhanced = clahe.apply(cv2.cvtColor(cv2.flip(frame, 1), cv2.COLOR_BGR2GRAY))
+        frame = None
+        if not ring.is_valid(seq):
+            continue
+
+        pending = last['box'] is not None and last['drowsy']
+        decision = gate.check(enhanced, allow_reuse=not pending)
+        if decision == RUN:
+            output = model(cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB),
+                           conf=CONFIDENCE_THRESHOLD, verbose=False)
+            last = {'box': None}
+            if output and output[0].boxes is not None and len(output[0].boxes) > 0:
+                boxes = output[0].boxes
+                best = int(boxes.conf.argmax())
+                class_id = int(boxes.cls[best])
+                last['box'] = tuple(map(int, boxes.xyxy[best]))
+                last['conf'] = float(boxes.conf[best])
+                last['class_id'] = class_id
+                last['label'] = str(model.names[class_id])
+                last['drowsy'] = class_id == DROWSY_CLASS_ID
+        fields = last if decision in (RUN, REUSE) else {'box': None}
+        _post(results, dict(fields, source='yolo', seq=seq, gate=decision,
+                            gate_counts=gate.counts))
+
+    ring.close()
+
+
+def telemetry_worker(spec, stop_event, results):
+    """Measure capture rate, optionally record the stream to disk"""
+    ring = FrameRing.attach(spec)
+    writer = None
+    if RECORD_PATH:
+        h, w = ring.shape[:2]
+        writer = cv2.VideoWriter(RECORD_PATH, cv2.VideoWriter_fourcc(*'XVID'), 30, (w, h))
+
+    seq = ring.latest_seq()
+    frames = 0
+    missed = 0
+    report_time = time.time()
+
+    while True:
+        new_seq = ring.wait_newer(seq, stop_event)
+        if new_seq is None:
+            break
+        if seq >= 0:
+            missed += new_seq - seq - 1
+        seq = new_seq
+        frames += 1
+        if writer is not None:
+            frame = ring.read(seq)
+            if frame is not None:
+                writer.write(frame)
+            frame = None
+
+        now = time.time()
+        if now - report_time >= TELEMETRY_INTERVAL:
+            _post(results, {'source': 'telemetry', 'seq': seq,
+                            'capture_fps': (frames + missed) / (now - report_time),
+                            'missed': missed})
+            frames = 0
+            missed = 0
+            report_time = now
+
+    if writer is not None:
+        writer.release()
+    ring.close()
+
+
+WORKERS = {
+    'capture': capture_worker,
+    'landmark': landmark_worker,
+    'yolo': yolo_worker,
+    'telemetry': telemetry_worker,
+}
+
+
+def _post(results, msg):
+    # Never block a worker on a slow display loop; stale results are dropped
+    try:
+        results.put_nowait(msg)
+    except queue.Full:
+        pass
+
+
+def start_worker(name, spec, stop_event, results):
+    process = multiprocessing.Process(target=WORKERS[name], name=name,
+                                      args=(spec, stop_event, results), daemon=True)
+    process.start()
+    return process
+
+
+def main():
+    mixer.init()
+    try:
+        alarm_sound = mixer.Sound('voice_alarm.wav')
+    except:
+        print("Warning: voice_alarm.wav not found. Audio alerts disabled.")
+        alarm_sound = None
+
+    # Check model files up front instead of letting workers crash on startup
+    names = list(WORKERS)
+    if EYE_BACKEND == 'classifier' and not os.path.exists(EYE_MODEL_PATH):
+        print(f"Error: Eye model not found at {EYE_MODEL_PATH} - run train_eye_classifier.py")
+        return
+    if not os.path.exists(MODEL_PATH):
+        print(f"Warning: YOLO model not found at {MODEL_PATH}. YOLO worker disabled.")
+        names.remove('yolo')
+
+    ring = FrameRing.create(NUM_SLOTS, FRAME_SHAPE)
+    stop_event = multiprocessing.Event()
+    results = multiprocessing.Queue(maxsize=64)
+    processes = {}
+    started = {}
+    died = {}
+    failures = {name: 0 for name in names}
+    for name in names:
+        processes[name] = start_worker(name, ring.spec(), stop_event, results)
+        started[name] = time.time()
+
+    window_name = 'Drowsiness Detection System - Multiprocess'
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    print(f"Started workers: {', '.join(names)}. Press 'q' to quit...")
+
+    latest = {}
+    ear_counter = 0
+    yolo_counter = 0
+    shown_seq = -1
+
+    try:
+        while True:
+            # Restart any consumer (or capture) that died, backing off on
+            # workers that keep failing right after they start
+            for name in list(processes):
+                if processes[name].is_alive():
+                    continue
+                now = time.time()
+                if name not in died:
+                    died[name] = now
+                    failures[name] = failures[name] + 1 if now - started[name] < MIN_UPTIME else 0
+                    if failures[name] > MAX_RESTARTS:
+                        print(f"Error: {name} worker failed {MAX_RESTARTS} restarts in a row, giving up")
+                        del processes[name]
+                        continue
+                    delay = RESTART_DELAY * 2 ** failures[name]
+                    print(f"Warning: {name} worker exited (code {processes[name].exitcode}), "
+                          f"restarting in {delay:.0f}s...")
+                elif now - died[name] >= RESTART_DELAY * 2 ** failures[name]:
+                    processes[name] = start_worker(name, ring.spec(), stop_event, results)
+                    started[name] = now
+                    del died[name]
+            if 'capture' not in processes:
+                break
+
+            # Collect results and update drowsiness counters
+            while True:
+                try:
+                    msg = results.get_nowait()
+                except queue.Empty:
+                    break
+                latest[msg['source']] = msg
+                # Only fresh inferences are evidence: reused results and dark /
+                # blurry frames leave the counters (and a pending alert) unchanged
+                if msg['source'] == 'landmark' and msg['gate'] == RUN and msg['face']:
+                    if msg['closed'] or msg['pitch'] > PITCH_THRESH:
+                        ear_counter += 1
+                    else:
+                        ear_counter = 0
+                elif msg['source'] == 'yolo' and msg['gate'] == RUN:
+                    if msg['box'] is not None and msg['drowsy']:
+                        yolo_counter += 1
+                    else:
+                        yolo_counter = max(0, yolo_counter - 1)
+                elif msg['source'] == 'telemetry':
+                    print(f"Capture: {msg['capture_fps']:.1f} FPS, missed by telemetry: {msg['missed']}")
+                    for name in ('landmark', 'yolo'):
+                        if name in latest:
+                            print(f"  {name} {format_counts(latest[name]['gate_counts'])}")
+
+            seq = ring.latest_seq()
+            frame = ring.read(seq) if seq > shown_seq else None
+            if frame is not None:
+                # Copy: we draw on it and the slot will be reused by capture
+                frame = frame.copy()
+                if not ring.is_valid(seq):
+                    frame = None  # Capture lapped us during the copy, frame may be torn
+            if frame is not None:
+                frame = cv2.flip(frame, 1)
+                shown_seq = seq
+                draw_overlay(frame, latest, ear_counter, yolo_counter)
+                cv2.imshow(window_name, frame)
+
+            alert = ear_counter >= CONSEC_FRAMES or yolo_counter >= ALERT_THRESHOLD
+            if alert and alarm_sound and not mixer.get_busy():
+                alarm_sound.play()
+
+            key = cv2.waitKey(1)
+            if key != -1 and (key & 0xFF) in (ord('q'), 27):
+                print("Exiting...")
+                break
+    finally:
+        stop_event.set()
+        for process in processes.values():
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        ring.close()
+        ring.unlink()
+        cv2.destroyAllWindows()
+
+
+def draw_overlay(frame, latest, ear_counter, yolo_counter):
+    w = frame.shape[1]
+    landmark = latest.get('landmark')
+    if landmark and landmark['face']:
+        cv2.putText(frame, f"{landmark['eye_text']} Pitch: {landmark['pitch']:.2f}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+    yolo = latest.get('yolo')
+    if yolo and yolo['box'] is not None:
+        # Boxes come from the flipped frame, same as the display
+        x1, y1, x2, y2 = yolo['box']
+        color = (0, 0, 255) if yolo['drowsy'] else (0, 255, 0)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+        cv2.putText(frame, f"{yolo['label']}: {yolo['conf']:.2f}", (x1, y1 - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+    skipped = [msg['gate'] for msg in (landmark, yolo) if msg and msg['gate'] not in (RUN, REUSE)]
+    if skipped:
+        cv2.putText(frame, f"Frame skipped: too {skipped[0]}", (10, frame.shape[0] - 20),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+
+    cv2.putText(frame, f'Eye/pitch frames: {ear_counter}/{CONSEC_FRAMES}  YOLO frames: {yolo_counter}/{ALERT_THRESHOLD}',
+                (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+    if ear_counter >= CONSEC_FRAMES or yolo_counter >= ALERT_THRESHOLD:
+        cv2.rectangle(frame, (0, 80), (w, 140), (0, 0, 255), -1)
+        cv2.putText(frame, '!!! DROWSINESS ALERT !!!', (80, 122),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.3, (0, 255, 255), 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,11 @@ import threading
 from pygame import mixer
 import time
 import os
+import sys
+
+# frame_gate.py lives in the repository root, two levels up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from frame_gate import FrameGate, RUN, REUSE
 
 # Initialize mixer for alarm sound
 mixer.init()
@@ -49,6 +54,28 @@ def play_alarm():
             print(f"Error playing alarm: {e}")
     is_alerting = False
 
+def parse_detection(results):
+    """Return (detection_count, best) where best is (x1, y1, x2, y2, conf, class_id) or None"""
+    if not results or len(results) == 0:
+        return 0, None
+    result = results[0]
+    if not hasattr(result, 'boxes') or result.boxes is None:
+        return 0, None
+    
+    # Find the detection with highest confidence
+    best_detection = None
+    best_confidence = 0
+    for box in result.boxes:
+        confidence = float(box.conf[0])
+        if confidence > best_confidence:
+            best_confidence = confidence
+            best_detection = box
+    
+    if best_detection is None:
+        return len(result.boxes), None
+    x1, y1, x2, y2 = map(int, best_detection.xyxy[0])
+    return len(result.boxes), (x1, y1, x2, y2, best_confidence, int(best_detection.cls[0]))
+
 def main():
     global drowsy_counter, is_alerting, face_detected_counter
     
@@ -95,6 +122,9 @@ def main():
     print("Window should open now...")
     
     frame_count = 0
+    gate = FrameGate()
+    last_detection = (0, None)
+    status = "ALERT"
     
     while cap.isOpened():
         success, frame = cap.read()
@@ -114,77 +144,74 @@ def main():
         clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         enhanced = clahe.apply(gray)
-        frame_enhanced = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB)
         
-        # Perform inference on enhanced frame
-        results = model(frame_enhanced, conf=CONFIDENCE_THRESHOLD, verbose=False)
+        # Gate inference: reuse the last detection on unchanged frames,
+        # skip frames that are too dark or blurry to classify
+        # (never reuse while drowsy evidence is pending, so alerts aren't delayed)
+        decision = gate.check(enhanced, allow_reuse=drowsy_counter == 0)
+        if decision == RUN:
+            # Perform inference on enhanced frame
+            frame_enhanced = cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB)
+            results = model(frame_enhanced, conf=CONFIDENCE_THRESHOLD, verbose=False)
+            last_detection = parse_detection(results)
+            detection = last_detection
+        elif decision == REUSE:
+            detection = last_detection
+        else:
+            detection = (0, None)
+            cv2.putText(frame, f'Frame skipped: too {decision}', (10, h - 20),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
         
         # Process results
         has_drowsy = False
-        detection_count = 0
-        best_detection = None
-        best_confidence = 0
+        detection_count, best_detection = detection
         
-        if results and len(results) > 0:
-            result = results[0]
+        # Process the best detection
+        if best_detection is not None:
+            x1, y1, x2, y2, confidence, class_id = best_detection
+            class_name = str(model.names[class_id])
             
-            # Get boxes and class names
-            if hasattr(result, 'boxes') and result.boxes is not None:
-                boxes = result.boxes
-                detection_count = len(boxes)
-                
-                # Find the detection with highest confidence
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    if confidence > best_confidence:
-                        best_confidence = confidence
-                        best_detection = box
-                
-                # Process the best detection
-                if best_detection is not None:
-                    x1, y1, x2, y2 = map(int, best_detection.xyxy[0])
-                    confidence = float(best_detection.conf[0])
-                    class_id = int(best_detection.cls[0])
-                    class_name = str(model.names[class_id])
-                    
-                    # Debug output
-                    if frame_count % 10 == 0:
-                        print(f"Best Detection - Class ID: {class_id}, Class Name: '{class_name}', Confidence: {confidence:.2f}")
-                    
-                    # Determine if drowsy based on class ID
-                    is_drowsy = (class_id == DROWSY_CLASS_ID)
-                    
-                    # Determine color based on class
-                    if is_drowsy:
-                        color = (0, 0, 255)  # Red for drowsy
-                        has_drowsy = True
-                    else:
-                        color = (0, 255, 0)  # Green for alert
-                    
-                    # Draw bounding box on original frame
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
-                    
-                    # Put label with confidence
-                    label = f'{class_name}: {confidence:.2f}'
-                    label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-                    cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), 
-                                (x1 + label_size[0], y1), color, -1)
-                    cv2.putText(frame, label, (x1, y1 - 5), 
-                              cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        # Update face detection counter
-        if detection_count > 0:
-            face_detected_counter += 1
-        else:
-            face_detected_counter = 0
+            # Debug output
+            if frame_count % 10 == 0:
+                print(f"Best Detection - Class ID: {class_id}, Class Name: '{class_name}', Confidence: {confidence:.2f}")
+            
+            # Determine if drowsy based on class ID
+            is_drowsy = (class_id == DROWSY_CLASS_ID)
+            
+            # Determine color based on class
+            if is_drowsy:
+                color = (0, 0, 255)  # Red for drowsy
+                has_drowsy = True
+            else:
+                color = (0, 255, 0)  # Green for alert
+            
+            # Draw bounding box on original frame
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+            
+            # Put label with confidence
+            label = f'{class_name}: {confidence:.2f}'
+            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+            cv2.rectangle(frame, (x1, y1 - label_size[1] - 10), 
+                        (x1 + label_size[0], y1), color, -1)
+            cv2.putText(frame, label, (x1, y1 - 5), 
+                      cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
         
-        # Update drowsiness counter
-        if has_drowsy:
-            drowsy_counter += 1
-            status = "DROWSY"
-        else:
-            drowsy_counter = max(0, drowsy_counter - 1)  # Gradual decrease
-            status = "ALERT"
+        # Only fresh inferences are evidence: reused results and frames too dark
+        # or blurry to classify leave the counters (and a pending alert) unchanged
+        if decision == RUN:
+            # Update face detection counter
+            if detection_count > 0:
+                face_detected_counter += 1
+            else:
+                face_detected_counter = 0
+            
+            # Update drowsiness counter
+            if has_drowsy:
+                drowsy_counter += 1
+                status = "DROWSY"
+            else:
+                drowsy_counter = max(0, drowsy_counter - 1)  # Gradual decrease
+                status = "ALERT"
         
         # Trigger alarm instantly when drowsiness detected (only once per episode)
         if drowsy_counter >= ALERT_THRESHOLD and not is_alerting:
@@ -208,6 +235,8 @@ def main():
                    (10, info_y + 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         cv2.putText(frame, f'Detections: {detection_count}', 
                    (10, info_y + 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(frame, f'Inference: {gate.counts[RUN]}/{frame_count} frames', 
+                   (10, info_y + 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         # Display frame
         try:
@@ -228,6 +257,7 @@ def main():
     cv2.destroyAllWindows()
     if alarm_sound:
         mixer.stop()
+    print(gate.summary())
 
 
 
@@ -0,0 +1,105 @@
+"""
+Shared-memory frame ring for multiprocess_detect.py
+The capture process writes frames into fixed-size slots of one shared block;
+consumer processes read the slots in place by sequence number, so frames are
+never pickled or copied between processes.
+"""
+
+import time
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class FrameRing:
+    """Ring of fixed-size frame slots backed by multiprocessing.shared_memory.
+
+    Header layout (int64): [latest_seq, slot_0_seq, ..., slot_n-1_seq].
+    A slot's sequence is set to -1 while it is being written, so readers can
+    tell a complete frame from one that is being overwritten.
+    """
+
+    def __init__(self, shm, num_slots, shape, dtype=np.uint8):
+        self.shm = shm
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        header_bytes = _header_bytes(num_slots)
+        self._header = np.ndarray((num_slots + 1,), dtype=np.int64, buffer=shm.buf)
+        self._frames = np.ndarray((num_slots,) + self.shape, dtype=self.dtype,
+                                  buffer=shm.buf, offset=header_bytes)
+
+    @classmethod
+    def create(cls, num_slots, shape, dtype=np.uint8):
+        """Allocate a new ring (call once, in the owning process)"""
+        frame_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        size = _header_bytes(num_slots) + frame_bytes * num_slots
+        ring = cls(shared_memory.SharedMemory(create=True, size=size), num_slots, shape, dtype)
+        ring._header[:] = -1
+        return ring
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to an existing ring from another process using its spec()"""
+        shm = shared_memory.SharedMemory(name=spec['name'])
+        return cls(shm, spec['num_slots'], spec['shape'], spec['dtype'])
+
+    def spec(self):
+        """Small picklable description passed to worker processes"""
+        return {'name': self.shm.name, 'num_slots': self.num_slots,
+                'shape': self.shape, 'dtype': self.dtype.str}
+
+    def write(self, frame):
+        """Copy a frame into the next slot and publish it. Returns its sequence."""
+        seq = int(self._header[0]) + 1
+        slot = seq % self.num_slots
+        self._header[slot + 1] = -1
+        np.copyto(self._frames[slot], frame)
+        self._header[slot + 1] = seq
+        self._header[0] = seq
+        return seq
+
+    def latest_seq(self):
+        return int(self._header[0])
+
+    def read(self, seq):
+        """Zero-copy view of frame `seq`, or None if it was already overwritten.
+
+        The view stays backed by shared memory, so check is_valid(seq) after
+        using it to make sure the writer did not lap the reader meanwhile.
+        """
+        if seq < 0:
+            return None
+        slot = seq % self.num_slots
+        if self._header[slot + 1] != seq:
+            return None
+        return self._frames[slot]
+
+    def is_valid(self, seq):
+        return seq >= 0 and self._header[seq % self.num_slots + 1] == seq
+
+    def wait_newer(self, last_seq, stop_event=None, poll=0.002):
+        """Block until a frame newer than last_seq is published.
+
+        Always returns the newest sequence, so slow consumers skip stale
+        frames instead of falling behind. Returns None once stop_event is set.
+        """
+        while stop_event is None or not stop_event.is_set():
+            seq = self.latest_seq()
+            if seq > last_seq:
+                return seq
+            time.sleep(poll)
+        return None
+
+    def close(self):
+        # Every view returned by read() must be released before this, otherwise
+        # SharedMemory.close() raises BufferError
+        del self._header, self._frames
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _header_bytes(num_slots):
+    # Keep the frame data 64-byte aligned after the header
+    return (8 * (num_slots + 1) + 63) // 64 * 64
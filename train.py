@@ -1,11 +1,14 @@
 from ultralytics import YOLO
 
+# Use 'nthuddd-1/data_dedup.yaml' (from dedup_dataset.py) to train on near-duplicate-free splits
+DATA_YAML = 'nthuddd-1/data.yaml'
+
 # Load a pretrained YOLOv8 Nano model 
 model = YOLO('yolov8n.pt') 
 
 # Train the model
 model.train(
-    data='nthuddd-1/data.yaml', 
+    data=DATA_YAML, 
     epochs=50,                 
     imgsz=640,                
     device='cpu')           
\ No newline at end of file
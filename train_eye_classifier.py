@@ -0,0 +1,235 @@
+"""
+Train the eye-state classifier used by eye_classifier.py
+Runs FaceMesh on the nthuddd-1 images, crops both eyes with the L_EYE/R_EYE
+landmarks and fits a tiny MLP in NumPy.
+
+Labels never come from the landmarks (that would just teach the model EAR):
+  * eye_labels.csv hand labels (image,eye,closed - make them with
+    label_eyes.py) take priority, per eye;
+  * otherwise frames from the eye-closure scenarios (EYE_SCENARIOS) use their
+    YOLO class for both eyes, DROWSY_CLASS_ID = closed. Yawning frames are
+    left out, their drowsy class says nothing about the eyes.
+
+Images are split by scene with dedup_dataset.split_by_scene (no near-duplicate
+frames across splits): 'train' scenes train the model, 'valid' and 'test'
+scenes are held out to compare it with the EAR threshold.
+Extracted patches are cached in eye_patches.npz, so re-training is fast.
+
+Run: python dedup_dataset.py && python train_eye_classifier.py
+Writes eye_state.npz (and eye_state.onnx if the onnx package is installed)
+"""
+
+import os
+import csv
+import cv2
+import numpy as np
+import mediapipe as mp
+from utils import calculate_ear, L_EYE, R_EYE
+from eye_classifier import extract_eye_patches, forward, MODEL_PATH, PATCH_SIZE, CLOSED_THRESH
+from dedup_dataset import list_images, load_index, split_by_scene, image_class, HAMMING_THRESH
+
+DATASET_DIR = 'nthuddd-1'
+PATCH_CACHE = 'eye_patches.npz'
+EYE_LABELS_CSV = 'eye_labels.csv'
+ONNX_PATH = 'eye_state.onnx'
+EYE_THRESH = 0.21    # EAR baseline from main.py, for comparison
+DROWSY_CLASS_ID = 0  # Class 0 frames show closed eyes in the blink scenarios
+EYE_SCENARIOS = ['sleepyCombination', 'slowBlinkWithNodding', 'nonsleepyCombination']
+EYES = ['left', 'right']
+
+HIDDEN = 32
+EPOCHS = 60
+BATCH_SIZE = 64
+LEARNING_RATE = 0.01
+WEIGHT_DECAY = 1e-4
+
+
+def create_face_mesh():
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
+
+
+def detect_eyes(path, face_mesh, clahe):
+    """(patches, [left EAR, right EAR]) for one image, or None if unusable"""
+    frame = cv2.imread(path)
+    if frame is None:
+        print(f"Warning: cannot read {path}, skipping")
+        return None
+    enhanced = clahe.apply(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    results = face_mesh.process(cv2.cvtColor(enhanced, cv2.COLOR_GRAY2RGB))
+    if not results.multi_face_landmarks:
+        return None
+    landmarks = results.multi_face_landmarks[0].landmark
+    patches = extract_eye_patches(enhanced, landmarks)
+    if patches is None:
+        return None
+    return patches, [calculate_ear(landmarks, L_EYE), calculate_ear(landmarks, R_EYE)]
+
+
+def load_patches(images):
+    """Eye patches for every image with a detected face, two rows per image"""
+    paths = [rel_path for _, rel_path in images]
+    if os.path.exists(PATCH_CACHE):
+        data = dict(np.load(PATCH_CACHE))
+        if 'scanned' in data and list(data['scanned']) == paths:  # Older caches used other keys
+            print(f"Using cached patches from {PATCH_CACHE}")
+            return data
+
+    face_mesh = create_face_mesh()
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    patches, ears, found, eyes = [], [], [], []
+    for rel_path in paths:
+        result = detect_eyes(os.path.join(DATASET_DIR, rel_path), face_mesh, clahe)
+        if result is None:
+            continue
+        # One sample per eye, in the same order as extract_eye_patches
+        patches.append(result[0])
+        ears += result[1]
+        found += [rel_path, rel_path]
+        eyes += [0, 1]
+    print(f"Found eyes in {len(patches)} of {len(paths)} images")
+    if not patches:
+        raise SystemExit("Error: FaceMesh found no usable face in any image - nothing to train on")
+
+    data = {'x': np.concatenate(patches), 'ear': np.array(ears, dtype=np.float32),
+            'paths': np.array(found), 'eyes': np.array(eyes), 'scanned': np.array(paths)}
+    np.savez_compressed(PATCH_CACHE, **data)
+    return data
+
+
+def load_hand_labels():
+    """{(image name, eye index): closed} from EYE_LABELS_CSV, if it exists"""
+    if not os.path.exists(EYE_LABELS_CSV):
+        return {}
+    with open(EYE_LABELS_CSV, newline='') as f:
+        return {(row['image'], EYES.index(row['eye'])): int(row['closed'])
+                for row in csv.DictReader(f)}
+
+
+def eye_labels(paths, eyes, hand_labels):
+    """Per-eye labels (1 = closed, 0 = open, -1 = unknown) and hand-labelled mask"""
+    labels = np.full(len(paths), -1, dtype=np.int64)
+    is_hand = np.zeros(len(paths), dtype=bool)
+    classes = {}
+    for i, (rel_path, eye) in enumerate(zip(paths, eyes)):
+        name = os.path.basename(rel_path)
+        if (name, eye) in hand_labels:
+            labels[i] = hand_labels[(name, eye)]
+            is_hand[i] = True
+        elif any(f'_{scenario}_' in name for scenario in EYE_SCENARIOS):
+            if rel_path not in classes:
+                classes[rel_path] = image_class(rel_path)
+            if classes[rel_path] is not None:
+                labels[i] = int(classes[rel_path] == DROWSY_CLASS_ID)
+    return labels, is_hand
+
+
+def train(x, y):
+    """Mini-batch SGD with momentum on binary cross-entropy"""
+    rng = np.random.default_rng(0)
+    n_in = x.shape[1]
+    params = {
+        'w1': rng.normal(0, np.sqrt(2.0 / n_in), (n_in, HIDDEN)).astype(np.float32),
+        'b1': np.zeros(HIDDEN, dtype=np.float32),
+        'w2': rng.normal(0, np.sqrt(1.0 / HIDDEN), (HIDDEN, 1)).astype(np.float32),
+        'b2': np.zeros(1, dtype=np.float32),
+    }
+    velocity = {k: np.zeros_like(v) for k, v in params.items()}
+    y = y.reshape(-1, 1).astype(np.float32)
+
+    for epoch in range(EPOCHS):
+        order = rng.permutation(len(x))
+        for start in range(0, len(x), BATCH_SIZE):
+            batch = order[start:start + BATCH_SIZE]
+            xb, yb = x[batch], y[batch]
+            hidden, prob = forward(xb, **params)
+
+            # Backprop through sigmoid + BCE, ReLU layer
+            d_out = (prob - yb) / len(batch)
+            d_hidden = (d_out @ params['w2'].T) * (hidden > 0)
+            grads = {
+                'w1': xb.T @ d_hidden + WEIGHT_DECAY * params['w1'],
+                'b1': d_hidden.sum(axis=0),
+                'w2': hidden.T @ d_out + WEIGHT_DECAY * params['w2'],
+                'b2': d_out.sum(axis=0),
+            }
+            for k in params:
+                velocity[k] = 0.9 * velocity[k] - LEARNING_RATE * grads[k]
+                params[k] += velocity[k].astype(np.float32)
+
+        if (epoch + 1) % 10 == 0:
+            prob = forward(x, **params)[1].ravel()
+            print(f"Epoch {epoch + 1}/{EPOCHS} - train accuracy {accuracy(prob > CLOSED_THRESH, y.ravel()):.3f}")
+    return params
+
+
+def accuracy(predicted, labels):
+    return float((predicted == labels.astype(bool)).mean()) if len(labels) else float('nan')
+
+
+def export_onnx(params):
+    try:
+        import onnx
+        from onnx import helper, numpy_helper, TensorProto
+    except ImportError:
+        print("onnx not installed - skipping ONNX export")
+        return
+    n_in = PATCH_SIZE * PATCH_SIZE
+    graph = helper.make_graph(
+        [helper.make_node('Gemm', ['patches', 'w1', 'b1'], ['fc1']),
+         helper.make_node('Relu', ['fc1'], ['hidden']),
+         helper.make_node('Gemm', ['hidden', 'w2', 'b2'], ['logit']),
+         helper.make_node('Sigmoid', ['logit'], ['closed'])],
+        'eye_state',
+        [helper.make_tensor_value_info('patches', TensorProto.FLOAT, ['N', n_in])],
+        [helper.make_tensor_value_info('closed', TensorProto.FLOAT, ['N', 1])],
+        [numpy_helper.from_array(v, name=k) for k, v in params.items()])
+    # Pin opset 13 / IR 7 so older onnxruntime builds can load the model
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)], ir_version=7)
+    onnx.save(model, ONNX_PATH)
+    print(f"Saved {ONNX_PATH}")
+
+
+def main():
+    images = list_images()
+    index = load_index(images)
+    hashes = np.array([np.frombuffer(bytes.fromhex(index[p]['hash']), dtype=np.uint8)
+                       for _, p in images])
+    scene_split = dict(zip((p for _, p in images), split_by_scene(images, hashes, HAMMING_THRESH)))
+
+    data = load_patches(images)
+    y, is_hand = eye_labels(data['paths'], data['eyes'], load_hand_labels())
+    split = np.array([scene_split[p] for p in data['paths']])
+    held_out = (split != 'train') & (y >= 0)
+    train_mask = (split == 'train') & (y >= 0)
+    if not train_mask.any() or not held_out.any():
+        raise SystemExit("Error: no labelled eyes in the train or held-out scenes")
+
+    print(f"Training on {train_mask.sum()} eyes ({(y[train_mask] == 1).sum()} closed), "
+          f"{held_out.sum()} held-out eyes from other scenes")
+    params = train(data['x'][train_mask], y[train_mask])
+    np.savez(MODEL_PATH, **params)
+    print(f"Saved {MODEL_PATH}")
+    export_onnx(params)
+
+    # Both scored per eye on scenes the model never saw
+    classifier = forward(data['x'], **params)[1].ravel() > CLOSED_THRESH
+    ear = data['ear'] < EYE_THRESH
+    glasses = np.array(['_glasses_' in p for p in data['paths']])
+    print("=" * 60)
+    print("HELD-OUT SCENES           classifier   EAR    eyes")
+    print("=" * 60)
+    rows = [('all', held_out), ('glasses', held_out & glasses), ('no glasses', held_out & ~glasses)]
+    if is_hand.any():
+        rows.append(('hand-labelled', held_out & is_hand))
+    for title, mask in rows:
+        print(f"{title:<20} {accuracy(classifier[mask], y[mask]):>10.3f} "
+              f"{accuracy(ear[mask], y[mask]):>7.3f} {mask.sum():>7}")
+
+
+if __name__ == '__main__':
+    main()
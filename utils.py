@@ -1,6 +1,11 @@
+import cv2
 import numpy as np
 from scipy.spatial import distance as dist
 
+# FaceMesh landmark indices for the six EAR points of each eye
+L_EYE = [362, 385, 387, 263, 373, 380]
+R_EYE = [33, 160, 158, 133, 153, 144]
+
 def calculate_ear(landmarks, eye_indices):
     # Landmarks are normalized (0.0 to 1.0), so we use them directly
     p2_p6 = dist.euclidean((landmarks[eye_indices[1]].x, landmarks[eye_indices[1]].y), 